@@ -1,11 +1,29 @@
-spec = model_spec.get('efficientdet_lite0')
+import os
+import sys
 
-train_data, validation_data, test_data = object_detector.DataLoader.from_csv('gs://cloud-ml-data/img/openimage/csv/salads_ml_use.csv')
+import tensorflow as tf
+from tflite_model_maker import model_spec, object_detector
 
-model = object_detector.create(train_data, model_spec=spec, batch_size=8, train_whole_model=True, validation_data=validation_data)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'workspace'))
+from train import evaluate_tflite_in_subprocess
 
-model.evaluate(test_data)
+# The TFLite evaluation runs in a spawned process, which re-imports this file,
+# so the steps only run when it is executed directly.
+if __name__ == '__main__':
+    # Allocate GPU memory on demand so evaluation can share the card with the trained model.
+    for gpu in tf.config.list_physical_devices('GPU'):
+        tf.config.experimental.set_memory_growth(gpu, True)
 
-model.export(export_dir='take68\workspace\exported_model')
+    spec = model_spec.get('efficientdet_lite0')
 
-model.evaluate_tflite('model.tflite', test_data)
+    train_data, validation_data, test_data = object_detector.DataLoader.from_csv('gs://cloud-ml-data/img/openimage/csv/salads_ml_use.csv')
+
+    # Head-only transfer learning; see workspace/train.py --fine-tune-epochs for an optional whole-model second stage.
+    model = object_detector.create(train_data, model_spec=spec, batch_size=8, train_whole_model=False, validation_data=validation_data)
+
+    model.evaluate(test_data)
+
+    model.export(export_dir='take68\workspace\exported_model')
+
+    # Evaluated in a separate process, so the interpreter's memory is freed when it exits.
+    evaluate_tflite_in_subprocess('model.tflite', test_data)
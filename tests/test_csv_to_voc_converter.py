@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'workspace'))
+
+import csv_to_voc_converter  # noqa: E402
+
+HEADER = 'label_name\tbbox_x\tbbox_y\tbbox_width\tbbox_height\timage_name\timage_width\timage_height\n'
+
+
+def write_csv(tmp_path, rows):
+    csv_file = tmp_path / 'annotations.csv'
+    csv_file.write_text(HEADER + ''.join('\t'.join(map(str, row)) + '\n' for row in rows),
+                        encoding='utf-8')
+    return str(csv_file)
+
+
+def read_all(reader, csv_file):
+    groups, row_count, image_count = reader(csv_file)
+    return sorted(groups), row_count, image_count
+
+
+@pytest.mark.skipif(csv_to_voc_converter.pa is None or csv_to_voc_converter.np is None,
+                    reason='pyarrow and numpy not installed')
+def test_arrow_reader_matches_row_reader(tmp_path):
+    csv_file = write_csv(tmp_path, [
+        ('Green', 433, ' 391', 9, 33, 'b.jpg', 640, 480),
+        ('A&B', 2000000000, 1, 2000000000, 2147483647, 'a.jpg', 640, 480),
+        ('Purple', -5, 0, 10, 20, 'a.jpg', 800, 600),
+        ('label_name', 'bbox_x', 'bbox_y', 'bbox_width', 'bbox_height', 'image_name',
+         'image_width', 'image_height'),
+    ])
+    arrow = read_all(csv_to_voc_converter.read_annotations_arrow, csv_file)
+    assert arrow == read_all(csv_to_voc_converter.read_annotations_rows, csv_file)
+    a_objects = dict(arrow[0])['a.jpg']['objects']
+    assert a_objects[0] == ('A&B', 2000000000, 1, 4000000000, 2147483648)
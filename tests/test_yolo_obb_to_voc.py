@@ -0,0 +1,75 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'workspace'))
+
+import yolo_obb_to_voc  # noqa: E402
+
+
+@pytest.fixture(params=['numpy', 'per-line'])
+def parser(request, monkeypatch):
+    if request.param == 'numpy':
+        if yolo_obb_to_voc.np is None:
+            pytest.skip('numpy not installed')
+    else:
+        monkeypatch.setattr(yolo_obb_to_voc, 'np', None)
+    return yolo_obb_to_voc.parse_yolo_obb_file
+
+
+def write_labels(tmp_path, text):
+    label_file = tmp_path / 'labels.txt'
+    label_file.write_text(text, encoding='utf-8')
+    return label_file
+
+
+def test_non_finite_corners_are_skipped(tmp_path, parser):
+    label_file = write_labels(tmp_path, (
+        'nan 2 3 4 5 6 7 8 Green 1\n'
+        '1 2 3 4 5 6 7 8 Purple 0\n'
+        '1 2 inf 4 5 6 7 8 Green 0\n'
+        '1 2 3 -inf 5 nan 7 8 Green 0\n'
+    ))
+    assert parser(label_file) == [yolo_obb_to_voc.VocObject('Purple', 1, 2, 7, 8, 0)]
+
+
+def test_only_non_finite_corners(tmp_path, parser):
+    label_file = write_labels(tmp_path, 'nan 2 3 4 5 6 7 8 Green 1\n')
+    assert parser(label_file) == []
+
+
+def test_large_values_are_not_wrapped(tmp_path, parser):
+    label_file = write_labels(tmp_path, (
+        '1e30 2 3 4 5 6 7 8 Green 1\n'
+        '1.9 -2.5 3 4 5 6 7 8 Green 99999999999999999999\n'
+    ))
+    assert parser(label_file) == [
+        yolo_obb_to_voc.VocObject('Green', 3, 2, int(1e30), 8, 1),
+        yolo_obb_to_voc.VocObject('Green', 1, -2, 7, 8, 99999999999999999999),
+    ]
+
+
+def test_place_image_into_symlinked_source_keeps_image(tmp_path):
+    source = tmp_path / 'images'
+    source.mkdir()
+    image = source / 'img.jpg'
+    image.write_bytes(b'image data')
+    target = tmp_path / 'target'
+    target.symlink_to(source, target_is_directory=True)
+
+    for link in (False, True):
+        yolo_obb_to_voc.place_image(image, target / 'img.jpg', link)
+        assert image.read_bytes() == b'image data'
+
+
+def test_place_image_copy_replaces_earlier_hard_link(tmp_path):
+    image = tmp_path / 'img.jpg'
+    image.write_bytes(b'image data')
+    dst = tmp_path / 'copy.jpg'
+
+    yolo_obb_to_voc.place_image(image, dst, link=True)
+    assert os.path.samefile(image, dst)
+    yolo_obb_to_voc.place_image(image, dst)
+    assert not os.path.samefile(image, dst)
+    assert image.read_bytes() == dst.read_bytes() == b'image data'
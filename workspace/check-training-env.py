@@ -11,14 +11,20 @@ Exit codes:
 
 import sys
 import os
+import re
 import argparse
-import glob
 import xml.etree.ElementTree as ET
 import shutil
 import importlib
+from concurrent.futures import ThreadPoolExecutor
 from importlib import util
 from importlib import metadata
 
+try:
+    from lxml import etree as LET
+except ImportError:
+    LET = None  # fall back to xml.etree
+
 CRITICAL_FAIL = False
 
 def fail(msg):
@@ -80,52 +86,90 @@ def check_tflite_model_maker():
             fail(f"tflite_model_maker.object_detector import failed: {type(e).__name__}: {e}")
     return mod
 
-def check_optional(name):
-    # Optional imports should not set the global critical-failure flag.
-    friendly = name
+def load_optional(name):
+    # import without reporting, so it can run on a worker thread: (version, error)
     try:
         mod = importlib.import_module(name)
-        ver = getattr(mod, "__version__", None)
-        if not ver:
-            try:
-                ver = metadata.version(name)
-            except Exception:
-                ver = "unknown"
-        ok(f"Imported {friendly} (version: {ver})")
-        return True
     except Exception as e:
-        # Report as a warning, do not mark CRITICAL_FAIL
-        warn(f"Optional package not importable: {friendly}: {type(e).__name__}: {e}")
-        return False
-
-def list_images(images_dir):
-    patterns = ("*.jpg","*.jpeg","*.png","*.bmp")
-    files = []
-    for p in patterns:
-        files.extend(glob.glob(os.path.join(images_dir, p)))
-    files = sorted(files)
-    return files
-
-def list_xmls(ann_dir):
-    return sorted(glob.glob(os.path.join(ann_dir, "*.xml")))
+        return None, e
+    ver = getattr(mod, "__version__", None)
+    if not ver:
+        try:
+            ver = metadata.version(name)
+        except Exception:
+            ver = "unknown"
+    return ver, None
 
-def parse_voc_xml(xml_file):
-    try:
-        tree = ET.parse(xml_file)
-        root = tree.getroot()
-        objs = []
-        for obj in root.findall('object'):
-            name = obj.find('name')
-            bndbox = obj.find('bndbox')
-            if name is None:
+def check_optional(name, result=None):
+    # Optional imports should not set the global critical-failure flag.
+    # result: a load_optional() result if the import already ran elsewhere
+    friendly = name
+    ver, e = result if result is not None else load_optional(name)
+    if e is None:
+        ok(f"Imported {friendly} (version: {ver})")
+        return True
+    # Report as a warning, do not mark CRITICAL_FAIL
+    warn(f"Optional package not importable: {friendly}: {type(e).__name__}: {e}")
+    return False
+
+IMAGE_EXTS = ("jpg", "jpeg", "png", "bmp")
+
+def scan_dir(d):
+    # one scandir pass, classifying entries by extension: stem -> path
+    imgs, xmls = {}, {}
+    with os.scandir(d) as it:
+        for e in it:
+            name = e.name
+            dot = name.rfind(".")
+            if dot <= 0:
                 continue
+            ext = name[dot + 1:].lower()
+            if ext in IMAGE_EXTS:
+                imgs[name[:dot]] = e.path
+            elif ext == "xml":
+                xmls[name[:dot]] = e.path
+    return imgs, xmls
+
+def _parse_voc_xml_lxml(xml_file):
+    # C streaming parser; each <object> is dropped once read
+    objs = []
+    for _, obj in LET.iterparse(xml_file, events=("end",), tag="object"):
+        name = obj.find('name')
+        if name is not None:
+            label = name.text.strip()
+            bndbox = obj.find('bndbox')
+            if bndbox is None:
+                bbox = None
+            else:
+                bbox = tuple(int(float(bndbox.findtext(x))) for x in ('xmin','ymin','xmax','ymax'))
+            objs.append((label, bbox))
+        obj.clear()
+    return objs
+
+def _parse_voc_xml_stdlib(xml_file):
+    # Same streaming walk with the stdlib parser; children of <object> have
+    # already ended when it does, so clearing it keeps the tree flat
+    objs = []
+    for _, elem in ET.iterparse(xml_file, events=("end",)):
+        if elem.tag != 'object':
+            continue
+        name = elem.find('name')
+        if name is not None:
             label = name.text.strip()
+            bndbox = elem.find('bndbox')
             if bndbox is None:
                 bbox = None
             else:
                 bbox = tuple(int(float(bndbox.find(x).text)) for x in ('xmin','ymin','xmax','ymax'))
             objs.append((label, bbox))
-        return objs
+        elem.clear()
+    return objs
+
+def parse_voc_xml(xml_file):
+    try:
+        if LET is not None:
+            return _parse_voc_xml_lxml(xml_file)
+        return _parse_voc_xml_stdlib(xml_file)
     except Exception as e:
         return f"PARSE_ERROR: {e}"
 
@@ -137,8 +181,13 @@ def check_dataset(images_dir, annotations_dir, min_images):
         fail(f"Annotations directory not found: {annotations_dir}")
         return
 
-    images = list_images(images_dir)
-    xmls = list_xmls(annotations_dir)
+    if os.path.abspath(annotations_dir) == os.path.abspath(images_dir):
+        imgs, xml_map = scan_dir(images_dir)
+    else:
+        imgs, _ = scan_dir(images_dir)
+        _, xml_map = scan_dir(annotations_dir)
+    images = sorted(imgs.values())
+    xmls = sorted(xml_map.values())
 
     ok(f"Found {len(images)} images and {len(xmls)} annotation XML files.")
 
@@ -146,9 +195,7 @@ def check_dataset(images_dir, annotations_dir, min_images):
         warn(f"Only {len(images)} images. Recommended at least {min_images} for meaningful training.")
 
     # match by basename
-    image_basenames = {os.path.splitext(os.path.basename(p))[0] for p in images}
-    xml_basenames = {os.path.splitext(os.path.basename(p))[0] for p in xmls}
-    common = image_basenames & xml_basenames
+    common = imgs.keys() & xml_map.keys()
     if len(common) == 0:
         fail("No matching image/annotation basenames found. Make sure XMLs match image filenames (e.g. img_001.jpg <-> img_001.xml).")
     else:
@@ -157,8 +204,11 @@ def check_dataset(images_dir, annotations_dir, min_images):
     # parse first few xmls
     labels_seen = set()
     errors = 0
-    for xml in xmls[:5]:
-        res = parse_voc_xml(xml)
+    sample = xmls[:5]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        # lxml releases the GIL while parsing
+        results = list(pool.map(parse_voc_xml, sample))
+    for xml, res in zip(sample, results):
         if isinstance(res, str) and res.startswith("PARSE_ERROR"):
             warn(f"Could not parse {xml}: {res}")
             errors += 1
@@ -197,17 +247,30 @@ def check_export_dir(export_dir):
         ok(f"Export dir exists: {export_dir}")
     check_disk_space(export_dir, min_bytes=1_000_000_000)
 
+def normalize_dist_name(name):
+    # PEP 503: runs of -, _ and . are equivalent, case-insensitive
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+def installed_distributions():
+    # one pass over sys.path; the first match wins, as in metadata.version()
+    installed = {}
+    for dist in metadata.distributions():
+        name = dist.metadata['Name']
+        if name:
+            installed.setdefault(normalize_dist_name(name), dist.version)
+    return installed
+
 def check_pip_packages(names):
     # best-effort: use importlib.metadata to fetch versions
+    installed = installed_distributions()
     results = {}
     for name in names:
-        try:
-            v = metadata.version(name)
+        v = installed.get(normalize_dist_name(name))
+        if v is not None:
             ok(f"Package installed: {name}=={v}")
-            results[name] = v
-        except Exception:
+        else:
             warn(f"Package not found (pip): {name}")
-            results[name] = None
+        results[name] = v
     return results
 
 def main():
@@ -221,12 +284,16 @@ def main():
     print("=== ENV CHECK START ===")
     check_python(3,8)
     tf_mod = check_tensorflow()
-    tflmm = check_tflite_model_maker()
 
-    # optional modules that are useful (not fatal)
+    # optional modules that are useful (not fatal); they are imported on
+    # threads while tflite_model_maker loads here. TF itself is already
+    # loaded above on the main thread, so none of them initializes it.
     optional_list = ["tf_models_official", "scann", "pycocotools"]
-    for opt in optional_list:
-        check_optional(opt)
+    with ThreadPoolExecutor(max_workers=len(optional_list)) as pool:
+        optional_results = pool.map(load_optional, optional_list)
+        tflmm = check_tflite_model_maker()
+        for opt, result in zip(optional_list, optional_results):
+            check_optional(opt, result)
 
     check_dataset(args.images, args.annotations, args.min_images)
     check_export_dir(args.export)
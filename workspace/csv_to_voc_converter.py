@@ -11,6 +11,11 @@ The converter:
 3. Converts bbox format: (x, y, width, height) → (xmin, ymin, xmax, ymax)
 4. Saves XML files to the annotations directory
 
+If pyarrow (and NumPy) is installed the CSV is ingested as one typed Arrow table;
+otherwise (or if the file has rows that cannot be cast) it falls back to
+parsing row by row with the csv module, with the box maths done by a
+numba kernel when numba is available.
+
 Usage:
     python csv_to_voc_converter.py \\
         --csv-file C:\\Users\\heven\\Downloads\\annotations.csv \\
@@ -22,11 +27,309 @@ import csv
 import os
 import sys
 import argparse
-from collections import defaultdict
-import xml.etree.ElementTree as ET
+from array import array
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+except ImportError:  # optional: fall back to the csv module
+    pa = None
+
+try:
+    from numba import njit
+except ImportError:  # optional: box maths in plain Python
+    njit = None
+
+
+STRING_COLUMNS = ('label_name', 'image_name')
+INT_COLUMNS = ('bbox_x', 'bbox_y', 'bbox_width', 'bbox_height', 'image_width', 'image_height')
+
+# Rows turned into Python objects at a time by the Arrow reader
+ARROW_BLOCK_ROWS = 1 << 14
+# Images per task sent to a writer process
+WRITE_CHUNK_SIZE = 64
+
+
+def read_annotations_arrow(csv_file):
+    """
+    Read the CSV into one Arrow table and group it by image.
+    
+    Columns are read as strings so duplicate header rows can be dropped
+    before the int32 cast, and the table is sorted so each image is a
+    contiguous run of rows. The int columns are then taken as NumPy
+    arrays, xmax/ymax computed with np.add (in int64, so two int32 values
+    can't wrap) and the run offsets with np.cumsum. The file is read and cast up front, so bad input raises
+    here; the groups are then built lazily, a block of runs at a time.
+    
+    Returns:
+        (groups, row_count, image_count), groups yielding (image_name, data)
+    """
+    columns = STRING_COLUMNS + INT_COLUMNS
+    table = pacsv.read_csv(
+        csv_file,
+        parse_options=pacsv.ParseOptions(delimiter='\t'),
+        convert_options=pacsv.ConvertOptions(
+            include_columns=list(columns),
+            column_types={name: pa.string() for name in columns}
+        )
+    )
+    
+    # Skip empty rows or header duplicates
+    image_name = pc.utf8_trim_whitespace(table['image_name'])
+    keep = pc.and_(
+        pc.not_equal(image_name, ''),
+        pc.invert(pc.starts_with(image_name, pattern='image_name'))
+    )
+    table = table.filter(keep)
+    
+    typed = {name: pc.utf8_trim_whitespace(table[name]) for name in STRING_COLUMNS}
+    for name in INT_COLUMNS:
+        typed[name] = pc.cast(pc.utf8_trim_whitespace(table[name]), pa.int32())
+    
+    # Stable sort keeps the CSV order of objects within an image
+    table = pa.table(typed).sort_by('image_name')
+    runs = pc.value_counts(table['image_name'])
+    images = runs.field('values').to_pylist()
+    ends = np.cumsum(runs.field('counts').to_numpy())
+    
+    # Convert (x, y, width, height) → (xmin, ymin, xmax, ymax) on int32 columns
+    xmins = table['bbox_x'].to_numpy()
+    ymins = table['bbox_y'].to_numpy()
+    xmaxs = np.add(xmins, table['bbox_width'].to_numpy(), dtype=np.int64)
+    ymaxs = np.add(ymins, table['bbox_height'].to_numpy(), dtype=np.int64)
+    widths = table['image_width'].to_numpy()
+    heights = table['image_height'].to_numpy()
+    
+    def groups():
+        i, start = 0, 0
+        while i < len(images):
+            # Whole runs, at least ARROW_BLOCK_ROWS rows (or what is left)
+            j = min(int(np.searchsorted(ends, start + ARROW_BLOCK_ROWS)) + 1, len(images))
+            stop = int(ends[j - 1])
+            objects = list(zip(
+                table['label_name'].slice(start, stop - start).to_pylist(),
+                xmins[start:stop].tolist(), ymins[start:stop].tolist(),
+                xmaxs[start:stop].tolist(), ymaxs[start:stop].tolist()))
+            
+            offset = start
+            for image, end in zip(images[i:j], ends[i:j].tolist()):
+                yield image, {
+                    'objects': objects[offset - start:end - start],
+                    # Last row wins, matching the row-by-row reader
+                    'width': int(widths[end - 1]),
+                    'height': int(heights[end - 1])
+                }
+                offset = end
+            i, start = j, stop
+    
+    return groups(), table.num_rows, len(images)
+
+
+def _box_corners_py(xs, ys, widths, heights):
+    """(x, y, width, height) columns → (xmax, ymax) lists."""
+    return ([x + w for x, w in zip(xs, widths)],
+            [y + h for y, h in zip(ys, heights)])
+
+
+if njit is not None:
+    @njit(cache=True)
+    def _box_corners_jit(xs, ys, widths, heights):
+        # int64 sums: two int32 values can't wrap, as with Python ints
+        n = xs.shape[0]
+        xmaxs = np.empty(n, np.int64)
+        ymaxs = np.empty(n, np.int64)
+        for i in range(n):
+            xmaxs[i] = np.int64(xs[i]) + np.int64(widths[i])
+            ymaxs[i] = np.int64(ys[i]) + np.int64(heights[i])
+        return xmaxs, ymaxs
+
+
+def box_corners(xs, ys, widths, heights):
+    """
+    Compute xmax/ymax for whole array('i') columns at once.
+    
+    With numba installed the columns are handed to a compiled kernel as
+    zero-copy int32 views; otherwise this is a plain zip over the arrays.
+    """
+    if njit is None:
+        return _box_corners_py(xs, ys, widths, heights)
+    views = [np.frombuffer(col, dtype=np.int32) for col in (xs, ys, widths, heights)]
+    xmaxs, ymaxs = _box_corners_jit(*views)
+    return xmaxs.tolist(), ymaxs.tolist()
+
+
+def read_annotations_rows(csv_file):
+    """
+    Read the CSV row by row with csv.DictReader and group it by image.
+    
+    Used when pyarrow is not installed, or when the file has rows that
+    the vectorized reader cannot cast; malformed rows are reported and
+    skipped.
+    
+    Returns:
+        (groups, row_count, image_count), groups yielding (image_name, data)
+    """
+    labels, image_names = [], []
+    xs, ys, widths, heights = array('i'), array('i'), array('i'), array('i')
+    image_widths, image_heights = array('i'), array('i')
+    
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        reader = csv.DictReader(f, delimiter='\t')
+        
+        # Skip header rows (sometimes there are duplicates)
+        for row in reader:
+            # Skip empty rows or header duplicates
+            if not row.get('image_name') or row['image_name'].startswith('image_name'):
+                continue
+            
+            try:
+                values = [int(row[name].strip()) for name in INT_COLUMNS]
+                label = row['label_name'].strip()
+                image_name = row['image_name'].strip()
+                # Only append once the whole row has parsed
+                xs.append(values[0])
+                ys.append(values[1])
+                widths.append(values[2])
+                heights.append(values[3])
+                image_widths.append(values[4])
+                image_heights.append(values[5])
+            except (ValueError, KeyError, OverflowError) as e:
+                print(f"[WARN] Skipping malformed row: {e}")
+                continue
+            labels.append(label)
+            image_names.append(image_name)
+    
+    # Convert (x, y, width, height) → (xmin, ymin, xmax, ymax)
+    xmaxs, ymaxs = box_corners(xs, ys, widths, heights)
+    
+    # Group annotations by image
+    annotations_by_image = defaultdict(lambda: {
+        'objects': [],
+        'width': None,
+        'height': None
+    })
+    for i, image_name in enumerate(image_names):
+        data = annotations_by_image[image_name]
+        data['objects'].append((labels[i], xs[i], ys[i], xmaxs[i], ymaxs[i]))
+        data['width'] = image_widths[i]
+        data['height'] = image_heights[i]
+    
+    return iter(annotations_by_image.items()), len(image_names), len(annotations_by_image)
+
+
+# Pascal VOC layout, filled in per image; only the text values change
+VOC_HEADER = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    '<annotation>\n'
+    '  <filename>{filename}</filename>\n'
+    '  <folder>images</folder>\n'
+    '  <size>\n'
+    '    <width>{width}</width>\n'
+    '    <height>{height}</height>\n'
+    '    <depth>3</depth>\n'
+    '  </size>\n'
+)
+VOC_OBJECT = (
+    '  <object>\n'
+    '    <name>{name}</name>\n'
+    '    <bndbox>\n'
+    '      <xmin>{xmin}</xmin>\n'
+    '      <ymin>{ymin}</ymin>\n'
+    '      <xmax>{xmax}</xmax>\n'
+    '      <ymax>{ymax}</ymax>\n'
+    '    </bndbox>\n'
+    '  </object>\n'
+)
+VOC_FOOTER = '</annotation>'
 
 
-def convert_csv_to_voc(csv_file, output_dir, images_dir=None):
+def write_voc_xml(xml_path, image_name, data):
+    """
+    Write one Pascal VOC annotation to disk.
+    
+    The document is the fixed VOC_HEADER/VOC_OBJECT/VOC_FOOTER skeleton
+    with each image's values formatted in (text escaped as XMLGenerator
+    would), so no elements are built per image and the file is written
+    in a single call.
+    """
+    parts = [VOC_HEADER.format(filename=escape(image_name),
+                               width=data['width'], height=data['height'])]
+    for name, xmin, ymin, xmax, ymax in data['objects']:
+        parts.append(VOC_OBJECT.format(
+            name=escape(name), xmin=xmin, ymin=ymin, xmax=xmax, ymax=ymax))
+    parts.append(VOC_FOOTER)
+    with open(xml_path, 'w', encoding='utf-8') as f:
+        f.write(''.join(parts))
+
+
+def _write_one(item):
+    """
+    Worker: write the XML for one (output_dir, image_name, data) item.
+    
+    Returns (xml_path, error) where error is None on success, so failures
+    are reported by the parent process.
+    """
+    output_dir, image_name, data = item
+    xml_filename = os.path.splitext(image_name)[0] + '.xml'
+    xml_path = os.path.join(output_dir, xml_filename)
+    try:
+        write_voc_xml(xml_path, image_name, data)
+    except Exception as e:
+        return xml_path, str(e)
+    return xml_path, None
+
+
+def _write_chunk(items):
+    """Worker: write a list of items, returning one _write_one result each."""
+    return [_write_one(item) for item in items]
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_voc_xmls(items, workers):
+    """
+    Write the XML for each (output_dir, image_name, data) item.
+    
+    Items are consumed lazily: chunks go to a process pool with at most
+    two per worker in flight, so the reader keeps producing groups while
+    earlier ones are written and only a bounded number is held at once.
+    
+    Yields:
+        (xml_path, error) per item, as returned by _write_one
+    """
+    if workers <= 1:
+        yield from map(_write_one, items)
+        return
+    
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        for chunk in _chunks(items, WRITE_CHUNK_SIZE):
+            pending.append(executor.submit(_write_chunk, chunk))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def convert_csv_to_voc(csv_file, output_dir, images_dir=None, workers=None):
     """
     Convert CSV annotations to Pascal VOC XML format.
     
@@ -35,6 +338,8 @@ def convert_csv_to_voc(csv_file, output_dir, images_dir=None):
                   bbox_width, bbox_height, image_name, image_width, image_height
         output_dir: Directory to write XML files
         images_dir: Optional directory containing images (for validation)
+        workers: Number of processes writing XML files (default: CPU count;
+                 1 writes them in this process)
     """
     
     if not os.path.exists(csv_file):
@@ -43,117 +348,41 @@ def convert_csv_to_voc(csv_file, output_dir, images_dir=None):
     
     os.makedirs(output_dir, exist_ok=True)
     
-    # Group annotations by image
-    annotations_by_image = defaultdict(lambda: {
-        'objects': [],
-        'width': None,
-        'height': None
-    })
-    
     print(f"[1/3] Reading CSV file: {csv_file}")
     
-    try:
-        with open(csv_file, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f, delimiter='\t')
-            
-            # Skip header rows (sometimes there are duplicates)
-            row_count = 0
-            for row in reader:
-                # Skip empty rows or header duplicates
-                if not row.get('image_name') or row['image_name'].startswith('image_name'):
-                    continue
-                
-                try:
-                    label = row['label_name'].strip()
-                    bbox_x = int(row['bbox_x'].strip())
-                    bbox_y = int(row['bbox_y'].strip())
-                    bbox_width = int(row['bbox_width'].strip())
-                    bbox_height = int(row['bbox_height'].strip())
-                    image_name = row['image_name'].strip()
-                    image_width = int(row['image_width'].strip())
-                    image_height = int(row['image_height'].strip())
-                    
-                    # Convert (x, y, width, height) → (xmin, ymin, xmax, ymax)
-                    xmin = bbox_x
-                    ymin = bbox_y
-                    xmax = bbox_x + bbox_width
-                    ymax = bbox_y + bbox_height
-                    
-                    # Store annotation
-                    annotations_by_image[image_name]['objects'].append({
-                        'name': label,
-                        'xmin': xmin,
-                        'ymin': ymin,
-                        'xmax': xmax,
-                        'ymax': ymax
-                    })
-                    annotations_by_image[image_name]['width'] = image_width
-                    annotations_by_image[image_name]['height'] = image_height
-                    
-                    row_count += 1
-                except (ValueError, KeyError) as e:
-                    print(f"[WARN] Skipping malformed row: {e}")
-                    continue
+    groups = None
+    row_count = image_count = 0
+    if pa is not None and np is not None:
+        try:
+            groups, row_count, image_count = read_annotations_arrow(csv_file)
+        except pa.ArrowException as e:
+            # Typed conversion is all-or-nothing; let the row reader report
+            # and skip the offending rows instead.
+            print(f"[WARN] Vectorized CSV ingest failed ({e}); falling back to row-by-row parsing")
     
-    except Exception as e:
-        print(f"[ERROR] Failed to read CSV: {e}")
-        sys.exit(1)
+    if groups is None:
+        try:
+            groups, row_count, image_count = read_annotations_rows(csv_file)
+        except Exception as e:
+            print(f"[ERROR] Failed to read CSV: {e}")
+            sys.exit(1)
     
-    print(f"[OK] Read {row_count} annotations for {len(annotations_by_image)} images")
+    print(f"[OK] Read {row_count} annotations for {image_count} images")
     
     # Generate XML files
     print(f"[2/3] Generating XML files...")
     
+    items = ((output_dir, image_name, data) for image_name, data in groups)
+    workers = workers or os.cpu_count() or 1
+    if image_count <= 1:
+        workers = 1
+    
     xml_count = 0
-    for image_name, data in annotations_by_image.items():
-        # Create XML structure
-        annotation = ET.Element('annotation')
-        
-        # Filename
-        filename_elem = ET.SubElement(annotation, 'filename')
-        filename_elem.text = image_name
-        
-        # Folder (optional)
-        folder_elem = ET.SubElement(annotation, 'folder')
-        folder_elem.text = 'images'
-        
-        # Size
-        size_elem = ET.SubElement(annotation, 'size')
-        width_elem = ET.SubElement(size_elem, 'width')
-        width_elem.text = str(data['width'])
-        height_elem = ET.SubElement(size_elem, 'height')
-        height_elem.text = str(data['height'])
-        depth_elem = ET.SubElement(size_elem, 'depth')
-        depth_elem.text = '3'
-        
-        # Objects
-        for obj in data['objects']:
-            obj_elem = ET.SubElement(annotation, 'object')
-            
-            name_elem = ET.SubElement(obj_elem, 'name')
-            name_elem.text = obj['name']
-            
-            bndbox_elem = ET.SubElement(obj_elem, 'bndbox')
-            xmin_elem = ET.SubElement(bndbox_elem, 'xmin')
-            xmin_elem.text = str(obj['xmin'])
-            ymin_elem = ET.SubElement(bndbox_elem, 'ymin')
-            ymin_elem.text = str(obj['ymin'])
-            xmax_elem = ET.SubElement(bndbox_elem, 'xmax')
-            xmax_elem.text = str(obj['xmax'])
-            ymax_elem = ET.SubElement(bndbox_elem, 'ymax')
-            ymax_elem.text = str(obj['ymax'])
-        
-        # Write to file
-        xml_filename = os.path.splitext(image_name)[0] + '.xml'
-        xml_path = os.path.join(output_dir, xml_filename)
-        
-        try:
-            tree = ET.ElementTree(annotation)
-            ET.indent(tree, space='  ')  # Pretty print (Python 3.9+)
-            tree.write(xml_path, encoding='utf-8', xml_declaration=True)
+    for xml_path, error in write_voc_xmls(items, workers):
+        if error:
+            print(f"[ERROR] Failed to write {xml_path}: {error}")
+        else:
             xml_count += 1
-        except Exception as e:
-            print(f"[ERROR] Failed to write {xml_path}: {e}")
     
     print(f"[OK] Generated {xml_count} XML files")
     
@@ -204,11 +433,18 @@ if __name__ == '__main__':
         default=None,
         help='Optional: directory containing images for validation'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=None,
+        help='Number of processes writing XML files (default: CPU count)'
+    )
     
     args = parser.parse_args()
     
     convert_csv_to_voc(
         csv_file=args.csv_file,
         output_dir=args.output_dir,
-        images_dir=args.images_dir
+        images_dir=args.images_dir,
+        workers=args.workers
     )
@@ -5,15 +5,426 @@ train.py
 TFLite Model Maker object detection training script.
 Trains an object detection model on your dataset and exports a TFLite model.
 
+Only the detection head is trained by default (train_whole_model=False):
+gradients stop at the backbone, which is much cheaper per epoch. For a
+two-stage recipe, pass --fine-tune-epochs N to then unfreeze the whole
+model and keep training it for N epochs at the lower --fine-tune-lr.
+
 Usage:
     python train.py [--help] [--epochs 100] [--batch-size 32] [--output model.tflite]
+    python train.py --epochs 50 --fine-tune-epochs 10
+    python train.py --auto-batch
+    python train.py --precision mixed_float16
 """
 
 import os
 import sys
 import argparse
+import copy
+import hashlib
+import subprocess
+import threading
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from pathlib import Path
 
+# Largest power-of-two batch that fits for EfficientDet-Lite0 at 320x320,
+# keyed by device memory in GB (from a batch-size sweep).
+BATCH_SIZE_BY_MEMORY_GB = ((24, 32), (12, 16), (8, 8), (4, 4))
+DEFAULT_BATCH_SIZE = 8
+
+PRECISION_POLICIES = ('float32', 'mixed_float16', 'mixed_bfloat16')
+QUANTIZATION_MODES = ('int8', 'fp16', 'fp32')
+
+HEX_DIGITS = frozenset('0123456789abcdef')
+
+# Give GPU kernel launches their own host threads so they don't compete with
+# the tf.data workers decoding the next batches. Must be set before TF loads.
+os.environ.setdefault("TF_GPU_THREAD_MODE", "gpu_private")
+
+def voc_cache_prefix(images_dir, annotations_dir, labels):
+    """
+    Content hash of a Pascal VOC split, used as Model Maker's cache prefix.
+
+    Covers every file's name, size and mtime in both directories plus the
+    label list, so the cached TFRecords are reused only while the dataset
+    is unchanged.
+    """
+    hasher = hashlib.blake2b(digest_size=16)
+    for directory in (images_dir, annotations_dir):
+        with os.scandir(directory) as it:
+            entries = sorted((e for e in it if e.is_file()), key=lambda e: e.name)
+        for entry in entries:
+            st = entry.stat()
+            hasher.update(f"{entry.name}:{st.st_size}:{int(st.st_mtime)}\n".encode('utf-8'))
+        hasher.update(b'\0')
+    hasher.update(' '.join(labels).encode('utf-8'))
+    return hasher.hexdigest()
+
+def load_voc_split(object_detector, images_dir, annotations_dir, labels, cache_dir):
+    """
+    Pascal VOC split as a Model Maker DataLoader, cached by its content hash.
+
+    The cache's metadata file is touched on every load, so its mtime is the
+    split's last use for prune_dataset_cache.
+    """
+    prefix = voc_cache_prefix(images_dir, annotations_dir, labels)
+    data = object_detector.DataLoader.from_pascal_voc(
+        images_dir,
+        annotations_dir,
+        labels,
+        cache_dir=cache_dir,
+        cache_prefix_filename=prefix
+    )
+    os.utime(os.path.join(cache_dir, prefix + '_meta_data.yaml'))
+    return data
+
+def prune_dataset_cache(cache_dir, keep):
+    """
+    Delete all but the keep most recently used datasets from cache_dir.
+
+    Files are grouped by the voc_cache_prefix hash their names start with
+    (Model Maker's TFRecords/metadata and the decoded-batch caches alike),
+    and a group's last use is its newest mtime. Other files are left alone.
+    from_pascal_voc writes each dataset as 100 TFRecord shards (its
+    num_shards default) plus the metadata and annotations JSON files, so a
+    dataset takes about the size of its encoded images on disk.
+    Returns the number of datasets removed.
+    """
+    groups = {}
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            prefix = entry.name[:32]
+            if entry.name[32:33] in ('-', '_') and set(prefix) <= HEX_DIGITS and entry.is_file():
+                groups.setdefault(prefix, []).append(entry)
+    by_use = sorted(groups.values(), key=lambda entries: max(e.stat().st_mtime for e in entries),
+                    reverse=True)
+    for entries in by_use[keep:]:
+        for entry in entries:
+            os.remove(entry.path)
+    return len(by_use[keep:])
+
+def device_memory_gb():
+    """
+    Memory available for training in GB: total memory of the first GPU
+    (via nvidia-smi), else available system RAM. None if it can't be read.
+    """
+    try:
+        out = subprocess.run(
+            ["nvidia-smi", "--query-gpu=memory.total", "--format=csv,noheader,nounits"],
+            capture_output=True, text=True, check=True, timeout=10
+        ).stdout
+        return int(out.split()[0]) / 1024
+    except (OSError, subprocess.SubprocessError, ValueError, IndexError):
+        pass
+    try:
+        import psutil
+        return psutil.virtual_memory().available / 1024 ** 3
+    except ImportError:
+        pass
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_AVPHYS_PAGES') / 1024 ** 3
+    except (AttributeError, ValueError, OSError):
+        return None
+
+def pick_batch_size(device_mem_gb, image_size=320):
+    """Largest batch size from BATCH_SIZE_BY_MEMORY_GB that fits in device_mem_gb."""
+    # Activation memory scales with the number of input pixels
+    effective_gb = device_mem_gb * (320 / image_size) ** 2
+    for mem_gb, batch_size in BATCH_SIZE_BY_MEMORY_GB:
+        if effective_gb >= mem_gb:
+            return batch_size
+    return 2
+
+def pick_precision_policy():
+    """
+    Keras mixed-precision policy for the local hardware, used for
+    --precision auto: mixed_float16 on GPUs with tensor cores (compute
+    capability 7.0+, Ampere included), float32 on older GPUs and on CPU.
+
+    Not the default: the TF-Hub backbone is a float32 KerasLayer that gets
+    autocast inputs, and the trained model keeps its policy through export,
+    so a mixed_float16 run also exports (and calibrates) float16 casts.
+
+    mixed_bfloat16 is never picked automatically: Model Maker 0.4.2 only
+    uses it on TPU, the spec's losses and post-processing are only tested
+    with float16/float32, and TF 2.8's GPU bfloat16 kernels are incomplete
+    (soft placement silently moves the missing ops to the CPU).
+    """
+    import tensorflow as tf
+
+    gpus = tf.config.list_physical_devices('GPU')
+    if not gpus:
+        return 'float32'
+    details = tf.config.experimental.get_device_details(gpus[0])
+    compute_capability = details.get('compute_capability') or (0, 0)
+    if compute_capability >= (7, 0):
+        return 'mixed_float16'
+    return 'float32'
+
+def create_model_spec(object_detector, policy):
+    """
+    EfficientDet-Lite0 spec training under the given mixed-precision policy.
+
+    The spec resets the global Keras policy in its constructor and only
+    knows float16, so the policy is applied after it is built. For
+    mixed_float16 the spec's own mixed_precision/loss_scale hparams are
+    set as well, so its optimizer is wrapped in a LossScaleOptimizer.
+    """
+    import tensorflow as tf
+
+    hparams = {}
+    if policy == 'mixed_float16':
+        hparams = {'mixed_precision': True, 'loss_scale': 2 ** 15}
+    spec = object_detector.EfficientDetLite0Spec(hparams=hparams)
+    tf.keras.mixed_precision.set_global_policy(policy)
+    return spec
+
+def quantization_config(mode, representative_data, calibration_steps):
+    """
+    Post-training quantization config for model.export.
+
+    int8 is full-integer quantization calibrated on calibration_steps
+    images of representative_data, keeping uint8 image input. As in Model
+    Maker's default config the outputs stay float and TFLITE_BUILTINS is
+    allowed next to the int8 ops, because the NMS op at the end of the
+    graph has no integer kernel. fp16 halves the weights only; fp32
+    exports the float model unchanged.
+    """
+    import tensorflow as tf
+    from tflite_model_maker.config import QuantizationConfig
+
+    if mode == 'fp32':
+        return None
+    if mode == 'fp16':
+        return QuantizationConfig.for_float16()
+    config = QuantizationConfig.for_int8(
+        representative_data,
+        quantization_steps=calibration_steps,
+        inference_output_type=None,
+        supported_ops=[tf.lite.OpsSet.TFLITE_BUILTINS_INT8, tf.lite.OpsSet.TFLITE_BUILTINS]
+    )
+    config.experimental_new_quantizer = True
+    return config
+
+def tune_input_pipeline(data, cache=False):
+    """
+    Wrap data.gen_dataset so the datasets Model Maker builds from it end
+    with prefetch(AUTOTUNE).
+
+    InputReader already interleaves and maps with AUTOTUNE, but its last
+    prefetch sits before .repeat(), so the training stream stalls every
+    time repeat restarts the file/parse pipeline. Prefetching after it
+    keeps batches queued across those restarts.
+
+    With cache=True, evaluation datasets are also cached: Keras re-runs
+    validation every epoch, and without the cache each run decodes and
+    anchor-labels the same images again. Training datasets are never
+    cached since they are augmented per epoch and repeat endlessly.
+    Every evaluation dataset built from data is cached and filled with a
+    full pass, so only wrap the DataLoader handed to training as
+    validation data (a copy.copy of it works); int8 calibration and test
+    evaluation only read parts of a split, or read it once.
+
+    cache=True holds the whole decoded split in host RAM (images plus all
+    anchor targets, on the order of 1.5 MB per image), so callers only
+    enable it on request.
+
+    cache can also be a file path prefix, in which case the decoded
+    batches are cached on disk and later runs read them back instead of
+    decoding the images at all.
+
+    There is one cache per batch size, drop_remainder setting and image
+    dtype (which follows the precision policy), so a cache is only read
+    back into an identical pipeline; a second request for the same one
+    (e.g. from fine_tune_whole_model) gets the already filled dataset.
+    """
+    import tensorflow as tf
+
+    gen_dataset = data.gen_dataset
+    cached = {}
+
+    def gen_prefetched_dataset(model_spec, batch_size=None, is_training=False, **kwargs):
+        dataset = gen_dataset(model_spec, batch_size=batch_size, is_training=is_training, **kwargs)
+        if cache and not is_training:
+            batch_size = batch_size or model_spec.config.batch_size
+            remainder = 'drop' if model_spec.config.drop_remainder else 'keep'
+            images_dtype = tf.nest.flatten(dataset.element_spec)[0].dtype.name
+            key = f"bs{batch_size}_{remainder}_{images_dtype}"
+            if key in cached:
+                data._dataset = cached[key]
+                return data._dataset
+            filename = f"{cache}_{key}" if isinstance(cache, str) else ''
+            dataset = dataset.cache(filename)
+            # Keras stops after validation_steps without reaching the end
+            # of the data, and tf.data drops a cache that was never fully
+            # read, so fill it with one complete pass now.
+            if not filename or not tf.io.gfile.exists(filename + '.index'):
+                dataset.reduce(tf.constant(0, tf.int64), lambda count, *_: count + 1)
+        dataset = dataset.prefetch(tf.data.AUTOTUNE)
+        if cache and not is_training:
+            cached[key] = dataset
+        data._dataset = dataset
+        return dataset
+
+    data.gen_dataset = gen_prefetched_dataset
+    return data
+
+def fine_tune_whole_model(model, train_data, val_data, epochs, batch_size, learning_rate):
+    """
+    Second training stage: unfreeze the backbone and keep training.
+
+    object_detector.create(train_whole_model=True) would rebuild the network
+    from TF-Hub, so this re-runs the spec's training loop on the already
+    trained Keras model with the freeze expression cleared and a lower
+    learning rate.
+    """
+    spec = model.model_spec
+    config = spec.config
+    config.var_freeze_expr = None
+    config.num_epochs = epochs
+    config.learning_rate = learning_rate
+    config.lr_warmup_init = learning_rate / 10
+    if val_data is not None and len(val_data) < batch_size:
+        val_data = None
+    with spec.ds_strategy.scope():
+        train_ds, steps_per_epoch, _ = model._get_dataset_and_steps(
+            train_data, batch_size, is_training=True)
+        val_ds, val_steps, val_json_file = model._get_dataset_and_steps(
+            val_data, batch_size, is_training=False)
+        spec.train(model.model, train_ds, steps_per_epoch, val_ds, val_steps,
+                   epochs, batch_size, val_json_file)
+    return model
+
+def make_lite_runner(tflite_path, num_threads):
+    """Model Maker's eval LiteRunner, with an interpreter using num_threads."""
+    import tensorflow as tf
+    from tensorflow_examples.lite.model_maker.third_party.efficientdet.keras.eval_tflite import LiteRunner
+
+    # LiteRunner builds a default single-threaded Interpreter in __init__.
+    # The AUTO resolver applies TFLite's built-in XNNPACK delegate to the
+    # float ops (on x86 as on ARM); num_threads sizes its thread pool too.
+    runner = LiteRunner.__new__(LiteRunner)
+    runner.interpreter = tf.lite.Interpreter(
+        tflite_path,
+        num_threads=num_threads,
+        experimental_op_resolver_type=tf.lite.experimental.OpResolverType.AUTO
+    )
+    runner.interpreter.allocate_tensors()
+    runner.input_details = runner.interpreter.get_input_details()
+    runner.output_details = runner.interpreter.get_output_details()
+    runner.only_network = False
+    return runner
+
+def evaluate_tflite_threaded(model_spec, tflite_path, data, workers=None, threads_per_worker=2,
+                             postprocess_batch=32):
+    """
+    COCO metrics of a TFLite model on data, same as model.evaluate_tflite.
+
+    Images are spread over a pool of threads, each with its own interpreter
+    (invoke releases the GIL). Detections are post-processed and fed to the
+    COCO evaluator in dataset order on the calling thread, with a bounded
+    number of images in flight. The interpreter only takes one image at a
+    time, but the post-processing ops are batch-wise, so finished images
+    are stacked and post-processed postprocess_batch at a time.
+    """
+    import numpy as np
+    import tensorflow as tf
+    from tensorflow_examples.lite.model_maker.third_party.efficientdet import postprocess, utils
+
+    if workers is None:
+        workers = max(1, (os.cpu_count() or 2) // threads_per_worker)
+    steps = len(data)
+    dataset = data.gen_dataset(model_spec, batch_size=1, is_training=False).take(steps)
+    evaluator, label_map = model_spec._get_evaluator_and_label_map(data.annotations_json_file)
+    height, width = utils.parse_image_size(model_spec.config.image_size)
+    normalize_factor = tf.constant([height, width, height, width], dtype=tf.float32)
+
+    local = threading.local()
+
+    def infer(images):
+        runner = getattr(local, 'runner', None)
+        if runner is None:
+            runner = local.runner = make_lite_runner(tflite_path, threads_per_worker)
+        return runner.run(images)
+
+    def update(finished):
+        # Same post-processing as ObjectDetectorSpec.evaluate_tflite, on a
+        # stack of single-image results
+        _, nms_scores, nms_classes, nms_boxes = (
+            np.concatenate(column) for column in zip(*(outputs for outputs, _ in finished)))
+        labels = [labels for _, labels in finished]
+        nms_classes += postprocess.CLASS_OFFSET
+        nms_boxes *= normalize_factor
+        if labels[0]['image_scales'] is not None:
+            image_scales = tf.concat([l['image_scales'] for l in labels], 0)
+            scales = tf.expand_dims(tf.expand_dims(image_scales, -1), -1)
+            nms_boxes = nms_boxes * tf.cast(scales, nms_boxes.dtype)
+        detections = postprocess.generate_detections_from_nms_output(
+            nms_boxes, nms_classes, nms_scores, tf.concat([l['source_ids'] for l in labels], 0))
+        detections = postprocess.transform_detections(detections)
+        groundtruth_data = tf.concat([l['groundtruth_data'] for l in labels], 0)
+        evaluator.update_state(groundtruth_data.numpy(), detections.numpy())
+        finished.clear()
+
+    progbar = tf.keras.utils.Progbar(steps)
+    done = 0
+    pending = deque()
+    finished = []
+
+    def collect():
+        nonlocal done
+        future, labels = pending.popleft()
+        finished.append((future.result(), labels))
+        done += 1
+        if len(finished) >= postprocess_batch:
+            update(finished)
+            progbar.update(done)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for images, labels in dataset:
+            pending.append((pool.submit(infer, images.numpy()), labels))
+            if len(pending) >= 2 * workers:
+                collect()
+        while pending:
+            collect()
+    if finished:
+        update(finished)
+    progbar.update(done)
+    print()
+
+    return model_spec._get_metric_dict(evaluator, label_map)
+
+def _evaluate_tflite_worker(tflite_path, tfrecord_file_patten, size, label_map,
+                            annotations_json_file):
+    """Evaluate a TFLite model on a Model Maker dataset, in a fresh process."""
+    import tensorflow as tf
+    # The interpreter runs on CPU; leave the GPU to the training process
+    tf.config.set_visible_devices([], 'GPU')
+    from tflite_model_maker import object_detector
+
+    data = object_detector.DataLoader(
+        tfrecord_file_patten, size, label_map, annotations_json_file)
+    model = object_detector.ObjectDetector(
+        object_detector.EfficientDetLite0Spec(), data.label_map)
+    return evaluate_tflite_threaded(model.model_spec, tflite_path, data)
+
+def evaluate_tflite_in_subprocess(tflite_path, data):
+    """
+    Evaluate the TFLite model (see evaluate_tflite_threaded) in a separate process.
+
+    The interpreter arena and the evaluation pipeline are freed when the
+    worker exits instead of staying resident next to the training graph.
+    The dataset is rebuilt in the worker from its cached TFRecords.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+        return pool.submit(
+            _evaluate_tflite_worker, tflite_path, data.tfrecord_file_patten,
+            len(data), data.label_map, data.annotations_json_file
+        ).result()
+
 def main():
     parser = argparse.ArgumentParser(
         description="Train TFLite object detection model using Model Maker"
@@ -68,17 +479,98 @@ def main():
     parser.add_argument(
         "--batch-size",
         type=int,
-        default=8,
-        help="Batch size for training (default: 8)"
+        default=None,
+        help=f"Batch size for training (default: {DEFAULT_BATCH_SIZE}, or picked from device memory with --auto-batch)"
+    )
+    parser.add_argument(
+        "--auto-batch",
+        action="store_true",
+        help="Pick the batch size from GPU memory (or system RAM on CPU) when --batch-size is not given"
+    )
+    parser.add_argument(
+        "--fine-tune-epochs",
+        type=int,
+        default=0,
+        help="Optional second stage: epochs of whole-model fine-tuning after the "
+             "head-only training (default: 0, disabled)"
+    )
+    parser.add_argument(
+        "--fine-tune-lr",
+        type=float,
+        default=0.008,
+        help="Base learning rate for the fine-tuning stage (default: 0.008, a tenth of the spec default)"
+    )
+    parser.add_argument(
+        "--precision",
+        choices=('auto',) + PRECISION_POLICIES,
+        default="float32",
+        help="Training precision policy (default: float32; auto picks mixed_float16 on GPUs "
+             "with compute capability 7.0+; the mixed policies are experimental and their "
+             "float16 casts end up in the exported model)"
+    )
+    parser.add_argument(
+        "--quantization",
+        choices=QUANTIZATION_MODES,
+        default="int8",
+        help="Post-training quantization of the exported model (default: int8, "
+             "calibrated on the validation set)"
+    )
+    parser.add_argument(
+        "--calibration-steps",
+        type=int,
+        default=100,
+        help="Validation images used to calibrate int8 quantization (default: 100)"
     )
     parser.add_argument(
         "--export-dir",
         default="/workspace/exported_model",
         help="Directory to export model and metadata"
     )
+    parser.add_argument(
+        "--cache-dir",
+        default="/workspace/cache",
+        help="Directory for cached TFRecords of the parsed datasets (reused while the data is unchanged)"
+    )
+    parser.add_argument(
+        "--cache-keep",
+        type=int,
+        default=9,
+        help="Most recently used datasets to keep in --cache-dir; older ones are deleted "
+             "(default: 9, the train/val/test splits of three dataset versions, each about "
+             "the size of its images in 100 TFRecord shards; 0 keeps all)"
+    )
+    parser.add_argument(
+        "--decoded-cache-dir",
+        default=None,
+        help="Cache the decoded validation batches on disk in this directory, reused "
+             "between epochs and across runs (default: no cache, re-decoded every epoch)"
+    )
+    parser.add_argument(
+        "--val-cache-in-memory",
+        action="store_true",
+        help="Cache the decoded validation batches in RAM for this run instead "
+             "(about 1.5 MB per validation image; ignored with --decoded-cache-dir)"
+    )
     
     args = parser.parse_args()
 
+    mem_gb = device_memory_gb()
+    recommended_batch = pick_batch_size(mem_gb) if mem_gb else None
+    if args.batch_size is None:
+        if args.auto_batch and recommended_batch:
+            args.batch_size = recommended_batch
+            print(f"[OK] --auto-batch: using batch size {args.batch_size} for {mem_gb:.1f} GB of device memory")
+        else:
+            if args.auto_batch:
+                print(f"[WARN] Could not determine device memory, using batch size {DEFAULT_BATCH_SIZE}")
+            args.batch_size = DEFAULT_BATCH_SIZE
+    elif recommended_batch and args.batch_size > recommended_batch:
+        print(f"[WARN] Batch size {args.batch_size} may not fit in {mem_gb:.1f} GB of device memory "
+              f"(recommended: {recommended_batch})")
+    elif recommended_batch and args.batch_size < recommended_batch:
+        print(f"[WARN] Batch size {args.batch_size} underuses {mem_gb:.1f} GB of device memory; "
+              f"{recommended_batch} would train faster (or pass --auto-batch)")
+
     # Validate inputs
     if not os.path.isdir(args.images):
         print(f"[ERROR] Training images directory not found: {args.images}")
@@ -98,8 +590,16 @@ def main():
     if not test_available:
         print(f"[WARN] Test set not found, skipping test evaluation")
 
-    # Create export directory if needed
+    # Create export and cache directories if needed
     os.makedirs(args.export_dir, exist_ok=True)
+    os.makedirs(args.cache_dir, exist_ok=True)
+    if args.decoded_cache_dir:
+        os.makedirs(args.decoded_cache_dir, exist_ok=True)
+    if args.cache_keep > 0:
+        for cache_dir in {args.cache_dir, args.decoded_cache_dir or args.cache_dir}:
+            removed = prune_dataset_cache(cache_dir, args.cache_keep)
+            if removed:
+                print(f"[OK] Removed {removed} stale dataset cache(s) from {cache_dir}")
 
     print("=" * 70)
     print("TFLite Model Maker - Object Detection Training")
@@ -111,24 +611,54 @@ def main():
     print(f"Class labels:          {args.labels}")
     print(f"Export directory:      {args.export_dir}")
     print(f"Output model:          {args.output}")
+    print(f"Dataset cache:         {args.cache_dir}")
+    if args.decoded_cache_dir:
+        print(f"Decoded cache:         {args.decoded_cache_dir}")
+    elif args.val_cache_in_memory:
+        print("Decoded cache:         validation batches in memory")
     print(f"Epochs:                {args.epochs}")
     print(f"Batch size:            {args.batch_size}")
+    print(f"Quantization:          {args.quantization}")
+    if args.fine_tune_epochs > 0:
+        print(f"Fine-tune epochs:      {args.fine_tune_epochs}")
     print("=" * 70)
 
     try:
+        import tensorflow as tf
         from tflite_model_maker import object_detector
     except ImportError as e:
         print(f"[ERROR] Failed to import tflite_model_maker: {e}")
         print("Make sure the environment has tflite_model_maker installed.")
         sys.exit(1)
 
+    # Allocate GPU memory on demand instead of reserving the whole card up front
+    for gpu in tf.config.list_physical_devices('GPU'):
+        tf.config.experimental.set_memory_growth(gpu, True)
+
+    # Load all splits at once. On a cold cache each from_pascal_voc reads its
+    # XMLs and images one file at a time, so the loads overlap that latency
+    # (and the test split is ready by the time training ends). Identical
+    # splits share one load so they never write the same cache files.
+    loader_pool = ThreadPoolExecutor(max_workers=3)
+    loads = {}
+
+    def load_split(images_dir, annotations_dir):
+        key = (os.path.realpath(images_dir), os.path.realpath(annotations_dir))
+        if key not in loads:
+            loads[key] = loader_pool.submit(
+                load_voc_split, object_detector, images_dir, annotations_dir, args.labels, args.cache_dir)
+        return loads[key]
+
+    train_load = load_split(args.images, args.annotations)
+    val_load = load_split(args.val_images, args.val_annotations)
+    if test_available:
+        test_load = load_split(args.test_images, args.test_annotations)
+    loader_pool.shutdown(wait=False)
+
     print("\n[1/5] Loading training dataset from Pascal VOC annotations...")
     try:
-        train_data = object_detector.DataLoader.from_pascal_voc(
-            args.images,
-            args.annotations,
-            args.labels
-        )
+        train_data = train_load.result()
+        tune_input_pipeline(train_data)
         print(f"[OK] Training dataset loaded: {len(train_data)} examples")
     except Exception as e:
         print(f"[ERROR] Failed to load training dataset: {e}")
@@ -142,11 +672,17 @@ def main():
 
     print("\n[2/5] Loading validation dataset...")
     try:
-        val_data = object_detector.DataLoader.from_pascal_voc(
-            args.val_images,
-            args.val_annotations,
-            args.labels
-        )
+        val_data = val_load.result()
+        # Only Keras validation during training reads the cached copy;
+        # int8 calibration and test evaluation use val_data itself
+        fit_val_data = val_data
+        val_cache = args.val_cache_in_memory
+        if args.decoded_cache_dir:
+            val_prefix = voc_cache_prefix(args.val_images, args.val_annotations, args.labels)
+            val_cache = os.path.join(args.decoded_cache_dir, val_prefix)
+        if val_cache:
+            fit_val_data = tune_input_pipeline(copy.copy(val_data), cache=val_cache)
+        tune_input_pipeline(val_data)
         print(f"[OK] Validation dataset loaded: {len(val_data)} examples")
     except Exception as e:
         print(f"[ERROR] Failed to load validation dataset: {e}")
@@ -156,8 +692,16 @@ def main():
 
     print("\n[3/5] Creating model specification...")
     try:
-        spec = object_detector.EfficientDetLite0Spec()
+        policy = pick_precision_policy() if args.precision == 'auto' else args.precision
+        if policy == 'mixed_float16' and not tf.config.list_physical_devices('GPU'):
+            print("[WARN] mixed_float16 needs a GPU, training in float32")
+            policy = 'float32'
+        spec = create_model_spec(object_detector, policy)
         print("[OK] Using EfficientDet-Lite0 model spec")
+        print(f"[OK] Precision policy: {policy}")
+        if policy != 'float32':
+            print(f"[WARN] {policy} is experimental: the exported TFLite model and its int8 "
+                  f"calibration will trace the mixed-precision casts")
     except Exception as e:
         print(f"[ERROR] Failed to load model spec: {e}")
         sys.exit(1)
@@ -170,7 +714,7 @@ def main():
             model_spec=spec,
             epochs=args.epochs,
             batch_size=args.batch_size,
-            validation_data=val_data,
+            validation_data=fit_val_data,
             train_whole_model=False
         )
         print("[OK] Training completed successfully")
@@ -180,10 +724,38 @@ def main():
         traceback.print_exc()
         sys.exit(1)
 
+    if args.fine_tune_epochs > 0:
+        print(f"\n[4/5] Fine-tuning whole model for {args.fine_tune_epochs} epochs "
+              f"(lr={args.fine_tune_lr})...")
+        try:
+            fine_tune_whole_model(
+                model,
+                train_data,
+                fit_val_data,
+                epochs=args.fine_tune_epochs,
+                batch_size=args.batch_size,
+                learning_rate=args.fine_tune_lr
+            )
+            print("[OK] Fine-tuning completed successfully")
+        except Exception as e:
+            print(f"[ERROR] Fine-tuning failed: {e}")
+            import traceback
+            traceback.print_exc()
+            sys.exit(1)
+
     print("\n[5/5] Exporting TFLite model...")
     try:
         os.makedirs(os.path.dirname(args.output), exist_ok=True)
-        model.export(export_dir=args.export_dir, tflite_filename='model.tflite')
+        # Layers Model Maker builds for export (not the trained ones, which
+        # keep the training policy) are created in float32
+        tf.keras.mixed_precision.set_global_policy('float32')
+        from tflite_model_maker.config import ExportFormat
+        model.export(
+            export_dir=args.export_dir,
+            tflite_filename='model.tflite',
+            quantization_config=quantization_config(args.quantization, val_data, args.calibration_steps),
+            export_format=[ExportFormat.TFLITE]
+        )
         print(f"[OK] Model exported to: {args.output}")
         print(f"[OK] Metadata exported to: {args.export_dir}/model_metadata.json")
     except Exception as e:
@@ -200,11 +772,7 @@ def main():
         
         print("\n[TEST] Loading test dataset...")
         try:
-            test_data = object_detector.DataLoader.from_pascal_voc(
-                args.test_images,
-                args.test_annotations,
-                args.labels
-            )
+            test_data = test_load.result()
             print(f"[OK] Test dataset loaded: {len(test_data)} examples")
         except Exception as e:
             print(f"[ERROR] Failed to load test dataset: {e}")
@@ -215,9 +783,8 @@ def main():
         if test_available:
             print("\n[TEST] Evaluating base model on test set...")
             try:
-                loss, coco_metrics = model.evaluate(test_data)
+                coco_metrics = model.evaluate(test_data)
                 print(f"[OK] Base model evaluation complete")
-                print(f"     Loss: {loss:.4f}")
                 if coco_metrics:
                     print(f"     COCO metrics: {coco_metrics}")
             except Exception as e:
@@ -225,9 +792,9 @@ def main():
             
             print("\n[TEST] Evaluating TFLite model on test set...")
             try:
-                tflite_loss, tflite_coco = model.evaluate_tflite(args.output, test_data)
+                # COCO metric dict, as from model.evaluate_tflite
+                tflite_coco = evaluate_tflite_in_subprocess(args.output, test_data)
                 print(f"[OK] TFLite model evaluation complete")
-                print(f"     Loss: {tflite_loss:.4f}")
                 if tflite_coco:
                     print(f"     COCO metrics: {tflite_coco}")
             except Exception as e:
@@ -10,50 +10,113 @@ Usage:
 
 import os
 import sys
-import glob
-import xml.etree.ElementTree as ET
 import argparse
-from collections import defaultdict
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
 
-def verify_image_exists(xml_path, image_dir):
-    """Check if the image referenced in XML exists."""
-    try:
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-        filename = root.find('filename')
-        if filename is not None:
-            image_path = os.path.join(image_dir, filename.text)
-            return os.path.exists(image_path), filename.text, image_path
-    except Exception as e:
-        return False, None, str(e)
-    return False, None, "No filename element found"
-
-def extract_labels(xml_path):
-    """Extract all object labels from an XML file."""
+try:
+    from lxml import etree as ET
+    HAVE_LXML = True
+except ImportError:
+    import xml.etree.ElementTree as ET  # same parse/find API, pure-Python fallback
+    HAVE_LXML = False
+
+def _iter_annotation_elements(xml_path):
+    """
+    Yield the <filename> and <object> elements of an XML file as they end.
+
+    Each element is detached from its parent once the caller has read it,
+    so the working set stays constant however many objects the file has.
+    """
+    if HAVE_LXML:
+        # libxml2 only hands back the two tags we ask for
+        for _, elem in ET.iterparse(xml_path, events=('end',), tag=('filename', 'object')):
+            yield elem
+            elem.clear()
+            while elem.getprevious() is not None:
+                del elem.getparent()[0]
+    else:
+        # xml.etree has no getparent(); track the open elements instead
+        parents = []
+        for event, elem in ET.iterparse(xml_path, events=('start', 'end')):
+            if event == 'start':
+                parents.append(elem)
+                continue
+            parents.pop()
+            if elem.tag in ('filename', 'object'):
+                yield elem
+                elem.clear()
+                if parents:
+                    parents[-1].remove(elem)
+
+def parse_annotation(xml_path):
+    """
+    Read the image filename and object labels from an XML file in one pass.
+
+    The file is streamed (see _iter_annotation_elements), so no full tree
+    is built.
+
+    Returns:
+        (referenced_filename, labels); referenced_filename is None if the
+        XML has no <filename> element
+    """
+    filename = None
     labels = []
-    try:
-        tree = ET.parse(xml_path)
-        root = tree.getroot()
-        for obj in root.findall('object'):
-            name_elem = obj.find('name')
+    for elem in _iter_annotation_elements(xml_path):
+        if elem.tag == 'filename':
+            if filename is None:
+                filename = elem.text
+        else:
+            name_elem = elem.find('name')
             if name_elem is not None:
                 labels.append(name_elem.text)
+    return filename, labels
+
+def process_xml(xml_path, image_prefix):
+    """
+    Parse one annotation and check the image it references.
+
+    Worker for the process pool in main(). image_prefix is the images
+    directory with a trailing separator.
+
+    Returns:
+        (label_counts, error, image_exists, referenced_name); label_counts
+        is a Counter of the file's labels, None with error set if the XML
+        could not be parsed
+    """
+    try:
+        filename, labels = parse_annotation(xml_path)
     except Exception as e:
-        return None, str(e)
-    return labels, None
+        return None, str(e), False, None
+
+    label_counts = Counter(labels)
+    if filename is None:
+        return label_counts, None, False, None
+    image_exists = os.path.exists(image_prefix + filename)
+    return label_counts, None, image_exists, filename
+
+def _scan_files(directory, extensions):
+    """Paths of the non-hidden files in directory whose extension is in extensions, sorted."""
+    paths = []
+    with os.scandir(directory) as it:
+        for entry in it:
+            # glob's '*' never matched dot-files either
+            if entry.name.startswith('.'):
+                continue
+            if os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                paths.append(entry.path)
+    paths.sort()
+    return paths
 
 def get_image_files(image_dir, extensions=('jpg', 'jpeg', 'png', 'bmp')):
     """Get all image files in a directory."""
-    images = []
-    for ext in extensions:
-        images.extend(glob.glob(os.path.join(image_dir, f"*.{ext}")))
-        images.extend(glob.glob(os.path.join(image_dir, f"*.{ext.upper()}")))
-    return sorted(set(images))
+    return _scan_files(image_dir, {f".{ext}" for ext in extensions})
 
 def get_annotation_files(annotation_dir):
     """Get all XML annotation files."""
-    return sorted(glob.glob(os.path.join(annotation_dir, "*.xml")))
+    return _scan_files(annotation_dir, {".xml"})
 
 def main():
     parser = argparse.ArgumentParser(description="Verify Pascal VOC dataset format")
@@ -124,33 +187,35 @@ def main():
     print("Checking annotation format...")
     print("-" * 70)
 
-    all_labels = defaultdict(int)
+    all_labels = Counter()
     annotation_errors = 0
     image_errors = 0
 
-    for xml_name in sorted(list(common))[:10]:  # Check first 10
-        xml_path = xml_basenames[xml_name]
-        image_path = image_basenames[xml_name]
-
-        # Check image exists
-        image_exists, referenced_name, resolved_path = verify_image_exists(xml_path, args.images)
-        if not image_exists:
-            image_errors += 1
-            print(f"[WARN] {xml_name}: Image not found - {referenced_name}")
-
-        # Extract labels
-        labels, error = extract_labels(xml_path)
-        if error:
-            annotation_errors += 1
-            print(f"[ERROR] {xml_name}: {error}")
-        else:
-            for label in labels:
-                all_labels[label] += 1
-            print(f"[OK]   {xml_name}: {len(labels)} objects, labels: {set(labels)}")
+    xml_names = sorted(common)
+    xml_paths = [xml_basenames[name] for name in xml_names]
+    image_prefix = os.path.join(args.images, '')
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(process_xml, xml_paths, repeat(image_prefix), chunksize=64)
+
+        # Every file is checked; problems are always reported, OK lines
+        # only for the first 10
+        for i, (xml_name, (label_counts, error, image_exists, referenced_name)) in enumerate(zip(xml_names, results)):
+            if not image_exists:
+                image_errors += 1
+                print(f"[WARN] {xml_name}: Image not found - {referenced_name}")
+
+            if error:
+                annotation_errors += 1
+                print(f"[ERROR] {xml_name}: {error}")
+            else:
+                # Per-file counts merge in O(unique labels)
+                all_labels.update(label_counts)
+                if i < 10:
+                    print(f"[OK]   {xml_name}: {sum(label_counts.values())} objects, labels: {set(label_counts)}")
 
     print()
     if len(common) > 10:
-        print(f"(Showing first 10 of {len(common)} files)")
+        print(f"(Showing first 10 of {len(common)} files; all were checked)")
 
     print()
     print("-" * 70)
@@ -5,108 +5,248 @@ YOLO OBB format: x1 y1 x2 y2 x3 y3 x4 y4 class_name difficulty
 We'll convert the rotated box to axis-aligned bounding box (AABB).
 """
 
+import math
 import os
 import sys
-import xml.etree.ElementTree as ET
+import shutil
+import warnings
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from pathlib import Path
-from xml.dom import minidom
+from xml.sax.saxutils import escape
+
+try:
+    import numpy as np
+except ImportError:  # optional: parse label files line by line
+    np = None
+
+try:
+    from PIL import Image
+except ImportError:  # optional: only fixed --width/--height
+    Image = None
+
+# One axis-aligned object of a label file
+VocObject = namedtuple('VocObject', 'name xmin ymin xmax ymax difficulty')
 
 
 def parse_yolo_obb_line(line):
     """Parse a single line of YOLO OBB format."""
-    parts = line.strip().split()
+    # Only the first 10 fields are used; leave the rest unsplit
+    parts = line.split(None, 10)
     if len(parts) < 10:
         return None
     
     # Extract 4 corner points (x1,y1, x2,y2, x3,y3, x4,y4)
     try:
-        coords = [float(parts[i]) for i in range(8)]
-        class_name = parts[8]
+        coords = x1, y1, x2, y2, x3, y3, x4, y4 = tuple(map(float, parts[:8]))
         difficulty = int(parts[9])
-        
-        # Get axis-aligned bounding box from rotated box
-        x_coords = [coords[0], coords[2], coords[4], coords[6]]
-        y_coords = [coords[1], coords[3], coords[5], coords[7]]
-        
-        xmin = int(min(x_coords))
-        ymin = int(min(y_coords))
-        xmax = int(max(x_coords))
-        ymax = int(max(y_coords))
-        
-        return {
-            'class': class_name,
-            'xmin': xmin,
-            'ymin': ymin,
-            'xmax': xmax,
-            'ymax': ymax,
-            'difficulty': difficulty
-        }
-    except (ValueError, IndexError):
+    except ValueError:
         return None
+    # float() accepts nan/inf; min/max would skip a nan that isn't first
+    if not all(map(math.isfinite, coords)):
+        return None
+    
+    # Get axis-aligned bounding box from rotated box
+    x_coords = (x1, x2, x3, x4)
+    y_coords = (y1, y2, y3, y4)
+    return VocObject(parts[8], int(min(x_coords)), int(min(y_coords)),
+                     int(max(x_coords)), int(max(y_coords)), difficulty)
+
+
+def parse_yolo_obb_file(label_file):
+    """
+    Parse all objects of a YOLO OBB label file.
+    
+    With NumPy the file is read as one array and the axis-aligned boxes
+    come from a min/max over the (N, 4, 2) corner array. Files NumPy can't
+    take as a table (short, ragged or malformed lines), or whose corners
+    don't fit int64, go through parse_yolo_obb_line instead, which skips
+    the bad lines. Rows with a nan/inf corner are dropped on both paths.
+    Either way the file is read only once.
+    """
+    with open(label_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    
+    if np is not None:
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')  # empty file
+                rows = np.loadtxt(lines, dtype=str, comments=None, ndmin=2)
+            if rows.size == 0:
+                return []
+            if rows.shape[1] >= 10:
+                corners = rows[:, :8].astype(np.float64).reshape(-1, 4, 2)
+                difficulties = rows[:, 9].astype(np.int64)
+                # astype(float64) accepts nan/inf, which have no int box
+                finite = np.isfinite(corners).all(axis=(1, 2))
+                corners = corners[finite]
+                # Larger values would wrap in astype(int64); int() doesn't
+                if (np.abs(corners) < 2.0 ** 63).all():
+                    # int() truncation, as in parse_yolo_obb_line
+                    mins = corners.min(axis=1).astype(np.int64).tolist()
+                    maxs = corners.max(axis=1).astype(np.int64).tolist()
+                    return [
+                        VocObject(name, xmin, ymin, xmax, ymax, difficulty)
+                        for name, (xmin, ymin), (xmax, ymax), difficulty
+                        in zip(rows[finite, 8].tolist(), mins, maxs, difficulties[finite].tolist())
+                    ]
+        except (ValueError, OverflowError):
+            pass
+    
+    objects = [parse_yolo_obb_line(line) for line in lines]
+    return [obj for obj in objects if obj]
+
+
+# Pascal VOC layout, filled in per image; only the text values change
+VOC_HEADER = """<?xml version='1.0' encoding='utf-8'?>
+<annotation>
+  <folder>images</folder>
+  <filename>{filename}</filename>
+  <path>{path}</path>
+  <source>
+    <database>Unknown</database>
+  </source>
+  <size>
+    <width>{width}</width>
+    <height>{height}</height>
+    <depth>3</depth>
+  </size>
+  <segmented>0</segmented>
+"""
+VOC_OBJECT = """  <object>
+    <name>{name}</name>
+    <pose>Unspecified</pose>
+    <truncated>0</truncated>
+    <difficult>{difficulty}</difficult>
+    <bndbox>
+      <xmin>{xmin}</xmin>
+      <ymin>{ymin}</ymin>
+      <xmax>{xmax}</xmax>
+      <ymax>{ymax}</ymax>
+    </bndbox>
+  </object>
+"""
+VOC_FOOTER = "</annotation>\n"
+
+
+def get_dims(image_file):
+    """(width, height) of an image, read from its header without decoding the pixels."""
+    with Image.open(image_file) as im:
+        return im.size
+
 
+def create_voc_xml(image_filename, image_width, image_height, objects, output_path,
+                   image_prefix='/workspace/data/images/'):
+    """
+    Create Pascal VOC XML annotation file.
+    
+    image_prefix is the image directory with a trailing separator; the
+    <path> element is image_prefix + image_filename.
+    """
+    parts = [VOC_HEADER.format(
+        filename=escape(image_filename),
+        path=escape(image_prefix + image_filename),
+        width=image_width,
+        height=image_height
+    )]
+    for obj in objects:
+        parts.append(VOC_OBJECT.format(
+            name=escape(obj.name),
+            difficulty=obj.difficulty,
+            xmin=obj.xmin,
+            ymin=obj.ymin,
+            xmax=obj.xmax,
+            ymax=obj.ymax
+        ))
+    parts.append(VOC_FOOTER)
+    
+    # One encoded write, without the text layer in between
+    with open(output_path, 'wb') as f:
+        f.write(''.join(parts).encode('utf-8'))
 
-def create_voc_xml(image_filename, image_width, image_height, objects, output_path):
-    """Create Pascal VOC XML annotation file."""
-    annotation = ET.Element('annotation')
+
+def place_image(src, dst, link=False):
+    """
+    Copy src to dst, or hard-link it when link is set.
     
-    folder = ET.SubElement(annotation, 'folder')
-    folder.text = 'images'
+    A hard link needs no data copy or extra disk space; if the filesystem
+    can't link (e.g. dst is on another device) it falls back to copy2.
+    If dst already is src (e.g. the target directory is a symlink to the
+    source), nothing is done.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        if link or os.path.realpath(src) == os.path.realpath(dst):
+            return
+        if os.stat(dst).st_nlink < 2:
+            return
+        # Break the hard link left by an earlier --link run instead of copying onto src
+        os.unlink(dst)
+    if link:
+        try:
+            if os.path.lexists(dst):
+                os.unlink(dst)
+            os.link(src, dst)
+            return
+        except OSError:
+            pass
+    shutil.copy2(src, dst)
+
+
+def _convert_one(label_file, image_prefix, target_img_prefix, target_ann_prefix, image_width, image_height, link=False):
+    """
+    Worker: convert one label file and copy its image.
     
-    filename = ET.SubElement(annotation, 'filename')
-    filename.text = image_filename
+    The directories come as prefixes ending in a separator, so paths are
+    built by plain concatenation. A width or height of None is read from
+    the image header.
+    Returns (converted, warning) where warning explains a skipped file,
+    so messages are printed by the parent process.
+    """
+    # Find corresponding image
+    base_name = label_file.stem
+    image_file = None
+    for ext in ['.jpg', '.png', '.jpeg']:
+        candidate = image_prefix + base_name + ext
+        if os.path.exists(candidate):
+            image_file = candidate
+            image_name = base_name + ext
+            break
     
-    path = ET.SubElement(annotation, 'path')
-    path.text = os.path.join('/workspace/data/images', image_filename)
+    if not image_file:
+        return False, f"No image found for {label_file.name}"
     
-    source = ET.SubElement(annotation, 'source')
-    database = ET.SubElement(source, 'database')
-    database.text = 'Unknown'
+    # Parse label file
+    objects = parse_yolo_obb_file(label_file)
     
-    size = ET.SubElement(annotation, 'size')
-    width = ET.SubElement(size, 'width')
-    width.text = str(image_width)
-    height = ET.SubElement(size, 'height')
-    height.text = str(image_height)
-    depth = ET.SubElement(size, 'depth')
-    depth.text = '3'
+    if not objects:
+        return False, f"No valid objects in {label_file.name}"
     
-    segmented = ET.SubElement(annotation, 'segmented')
-    segmented.text = '0'
+    if image_width is None or image_height is None:
+        try:
+            width, height = get_dims(image_file)
+        except OSError:
+            return False, f"Cannot read image size of {image_name}"
+        image_width = image_width or width
+        image_height = image_height or height
     
-    for obj in objects:
-        obj_elem = ET.SubElement(annotation, 'object')
-        
-        name = ET.SubElement(obj_elem, 'name')
-        name.text = obj['class']
-        
-        pose = ET.SubElement(obj_elem, 'pose')
-        pose.text = 'Unspecified'
-        
-        truncated = ET.SubElement(obj_elem, 'truncated')
-        truncated.text = '0'
-        
-        difficult = ET.SubElement(obj_elem, 'difficult')
-        difficult.text = str(obj['difficulty'])
-        
-        bndbox = ET.SubElement(obj_elem, 'bndbox')
-        xmin_elem = ET.SubElement(bndbox, 'xmin')
-        xmin_elem.text = str(obj['xmin'])
-        ymin_elem = ET.SubElement(bndbox, 'ymin')
-        ymin_elem.text = str(obj['ymin'])
-        xmax_elem = ET.SubElement(bndbox, 'xmax')
-        xmax_elem.text = str(obj['xmax'])
-        ymax_elem = ET.SubElement(bndbox, 'ymax')
-        ymax_elem.text = str(obj['ymax'])
-    
-    # Pretty print
-    xml_str = minidom.parseString(ET.tostring(annotation)).toprettyxml(indent="  ")
-    
-    with open(output_path, 'w', encoding='utf-8') as f:
-        f.write(xml_str)
-
-
-def convert_split(source_root, split_name, target_images_dir, target_annotations_dir, image_width=640, image_height=480):
-    """Convert a single split (train/test/valid)."""
+    # Copy (or link) image
+    place_image(image_file, target_img_prefix + image_name, link)
+    
+    # Create XML
+    xml_path = target_ann_prefix + base_name + '.xml'
+    create_voc_xml(image_name, image_width, image_height, objects, xml_path, target_img_prefix)
+    
+    return True, None
+
+
+def convert_split(source_root, split_name, target_images_dir, target_annotations_dir, image_width=None, image_height=None, workers=None, link=False):
+    """
+    Convert a single split (train/test/valid).
+    
+    image_width/image_height fix the size written to every XML; when None,
+    each image's own size is used.
+    """
     label_dir = Path(source_root) / split_name / 'labelTxt'
     image_dir = Path(source_root) / split_name / 'images'
     
@@ -122,45 +262,28 @@ def convert_split(source_root, split_name, target_images_dir, target_annotations
     converted = 0
     skipped = 0
     
-    for label_file in label_dir.glob('*.txt'):
-        # Find corresponding image
-        base_name = label_file.stem
-        image_file = None
-        for ext in ['.jpg', '.png', '.jpeg']:
-            candidate = image_dir / f"{base_name}{ext}"
-            if candidate.exists():
-                image_file = candidate
-                break
-        
-        if not image_file:
-            print(f"[WARN] No image found for {label_file.name}")
-            skipped += 1
-            continue
-        
-        # Parse label file
-        objects = []
-        with open(label_file, 'r', encoding='utf-8') as f:
-            for line in f:
-                obj = parse_yolo_obb_line(line)
-                if obj:
-                    objects.append(obj)
-        
-        if not objects:
-            print(f"[WARN] No valid objects in {label_file.name}")
+    # Joined once per split; the target image prefix is also the <path> in the XMLs
+    image_prefix = os.path.join(str(image_dir), '')
+    target_img_prefix = os.path.join(os.path.abspath(target_img_split), '')
+    target_ann_prefix = os.path.join(str(target_ann_split), '')
+    
+    label_files = list(label_dir.glob('*.txt'))
+    args = (label_files, repeat(image_prefix), repeat(target_img_prefix), repeat(target_ann_prefix),
+            repeat(image_width), repeat(image_height), repeat(link))
+    workers = workers or os.cpu_count() or 1
+    
+    if workers > 1 and len(label_files) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_convert_one, *args, chunksize=32))
+    else:
+        results = map(_convert_one, *args)
+    
+    for ok, warning in results:
+        if ok:
+            converted += 1
+        else:
+            print(f"[WARN] {warning}")
             skipped += 1
-            continue
-        
-        # Copy image
-        import shutil
-        target_img_path = target_img_split / image_file.name
-        shutil.copy2(image_file, target_img_path)
-        
-        # Create XML
-        xml_filename = base_name + '.xml'
-        xml_path = target_ann_split / xml_filename
-        create_voc_xml(image_file.name, image_width, image_height, objects, xml_path)
-        
-        converted += 1
     
     return converted, skipped
 
@@ -171,18 +294,29 @@ def main():
     parser.add_argument('--source', required=True, help='Path to YOLO dataset root (contains train/test/valid)')
     parser.add_argument('--target-images', default='/workspace/data/images', help='Target images directory')
     parser.add_argument('--target-annotations', default='/workspace/data/annotations', help='Target annotations directory')
-    parser.add_argument('--width', type=int, default=640, help='Image width (default: 640)')
-    parser.add_argument('--height', type=int, default=480, help='Image height (default: 480)')
+    parser.add_argument('--width', type=int, default=None, help='Image width for all images (default: read from each image)')
+    parser.add_argument('--height', type=int, default=None, help='Image height for all images (default: read from each image)')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count)')
+    parser.add_argument('--link', action='store_true',
+                        help='Hard-link images into the target instead of copying them (falls back to copying across filesystems)')
     
     args = parser.parse_args()
     
+    if Image is None and (args.width is None or args.height is None):
+        print("[WARN] Pillow not installed, can't read image sizes; assuming 640x480 unless --width/--height are given")
+        args.width = args.width or 640
+        args.height = args.height or 480
+    
     print("=" * 70)
     print("YOLO OBB → Pascal VOC Converter")
     print("=" * 70)
     print(f"Source:      {args.source}")
     print(f"Images:      {args.target_images}")
     print(f"Annotations: {args.target_annotations}")
-    print(f"Image size:  {args.width}x{args.height}")
+    if args.width is None and args.height is None:
+        print("Image size:  read from each image")
+    else:
+        print(f"Image size:  {args.width or 'auto'}x{args.height or 'auto'}")
     print("=" * 70)
     
     total_converted = 0
@@ -196,7 +330,9 @@ def main():
             args.target_images, 
             args.target_annotations,
             args.width,
-            args.height
+            args.height,
+            args.workers,
+            args.link
         )
         print(f"  Converted: {converted}")
         print(f"  Skipped:   {skipped}")